@@ -1,11 +1,18 @@
 import os
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
+try:
+    import numexpr as ne
+    _HAVE_NUMEXPR = True
+except ImportError:  # numexpr is optional; plain NumPy is the fallback
+    _HAVE_NUMEXPR = False
+
 from data_feed import fetch_history
-from baseline_rules import make_signals, pips_to_price, INSTRUMENT
+from baseline_rules import make_signals, pip_size, pips_to_price, INSTRUMENT
 
 load_dotenv()
 
@@ -13,55 +20,70 @@ LOOKBACK = int(os.getenv("LOOKBACK_CANDLES", "1000"))
 SPREAD_PIPS = float(os.getenv("SPREAD_PIPS", "0.8"))
 SLIPPAGE_PIPS = float(os.getenv("SLIPPAGE_PIPS", "0.2"))
 
+# spread and slippage always enter the cost model together
+COST_PIPS = SPREAD_PIPS + SLIPPAGE_PIPS
+
 def apply_costs(price: float, side: str, instrument: str) -> float:
     """Apply spread + slippage to a fill price (very simple cost model)."""
-    spread = pips_to_price(SPREAD_PIPS, instrument)
-    slip   = pips_to_price(SLIPPAGE_PIPS, instrument)
+    cost = pips_to_price(COST_PIPS, instrument)
     if side == "long":
-        return price + spread + slip
-    return price - spread - slip
+        return price + cost
+    return price - cost
+
+def compute_bt(df: pd.DataFrame, inst: str) -> pd.DataFrame:
+    """Signal generation + costing for already-fetched history (no network)."""
+    trades = make_signals(df, instrument=inst)
+    if not len(trades):
+        return pd.DataFrame()
+
+    # make_signals returns a TRADE_DTYPE structured array: the fields are
+    # already typed columns, so the cost math runs straight on them
+    entries = trades["entry"]
+    exits = trades["exit"]
+    # 'direction' rather than 'sign': numexpr reserves sign() as a function
+    direction = np.where(trades["side"] == "long", 1.0, -1.0)
+    # both the entry fill and the exit fill pay spread + slippage
+    cost = 2.0 * COST_PIPS * pip_size(inst)
+    if _HAVE_NUMEXPR:
+        # fused multi-threaded kernel, no intermediate arrays
+        pnl = ne.evaluate("direction * (exits - entries) - cost")
+    else:
+        pnl = direction * (exits - entries) - cost
+    return pd.DataFrame({
+        "time": pd.DatetimeIndex(trades["time"]).tz_localize("UTC"),
+        "exit_time": pd.DatetimeIndex(trades["exit_time"]).tz_localize("UTC"),
+        "side": trades["side"],
+        "entry": entries,
+        "exit": exits,
+        "exit_reason": trades["reason"],
+        "pnl": pnl,
+    }, copy=False)
 
 def baseline_bt(inst: str) -> pd.DataFrame:
     """Run the baseline breakout strategy over recent history and return trade rows."""
     df = fetch_history(inst, lookback=LOOKBACK)
     if df.empty:
         raise SystemExit("No data fetched.")
-    trades = make_signals(df, instrument=inst)
-
-    rows = []
-    for tr in trades:
-        entry_costed = apply_costs(tr.entry, tr.side, inst)
-        # exiting a long is a short fill (and vice versa) for the simple cost model
-        exit_side = "short" if tr.side == "long" else "long"
-        exit_costed = apply_costs(tr.exit, exit_side, inst)
-        pnl = (exit_costed - entry_costed) if tr.side == "long" else (entry_costed - exit_costed)
-        rows.append({
-            "time": tr.time,
-            "exit_time": tr.exit_time,
-            "side": tr.side,
-            "entry": tr.entry,
-            "exit": tr.exit,
-            "exit_reason": tr.exit_reason,
-            "pnl": pnl,
-        })
-    return pd.DataFrame(rows)
+    return compute_bt(df, inst)
 
 def metrics(df_tr: pd.DataFrame) -> dict:
     if df_tr.empty:
         return {"trades": 0, "pnl": 0.0, "sharpe": 0.0, "max_dd": 0.0, "hit": 0.0, "pf": 0.0}
-    pnl_curve = df_tr["pnl"].cumsum()
-    ret = df_tr["pnl"].fillna(0.0)
-    sharpe = (ret.mean() / (ret.std() + 1e-9)) * np.sqrt(252)
-    peak = pnl_curve.cummax()
-    dd = (pnl_curve - peak)
-    max_dd = float(dd.min())
-    wins = int((df_tr["pnl"] > 0).sum())
-    losses = int((df_tr["pnl"] < 0).sum())
-    pf = (df_tr[df_tr["pnl"] > 0]["pnl"].sum() /
-          abs(df_tr[df_tr["pnl"] < 0]["pnl"].sum())) if losses > 0 else float("inf")
+    # single pass over a plain float array; no intermediate Series
+    pnl = df_tr["pnl"].to_numpy()
+    ret = np.nan_to_num(pnl)
+    sharpe = (ret.mean() / (ret.std(ddof=1) + 1e-9)) * np.sqrt(252)
+    curve = np.cumsum(pnl)
+    peak = np.maximum.accumulate(curve)
+    max_dd = float((curve - peak).min())
+    pos = pnl > 0
+    neg = pnl < 0
+    wins = int(pos.sum())
+    losses = int(neg.sum())
+    pf = (pnl[pos].sum() / abs(pnl[neg].sum())) if losses > 0 else float("inf")
     return {
         "trades": int(len(df_tr)),
-        "pnl": float(df_tr["pnl"].sum()),
+        "pnl": float(np.nansum(pnl)),
         "sharpe": float(sharpe),
         "max_dd": max_dd,
         "hit": float(wins / max(1, (wins + losses))),
@@ -70,19 +92,40 @@ def metrics(df_tr: pd.DataFrame) -> dict:
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--instrument", default=INSTRUMENT)
+    ap.add_argument("--instruments", default=INSTRUMENT,
+                    help="comma-separated, e.g. EUR_USD,GBP_USD")
     args = ap.parse_args()
+    insts = [s.strip() for s in args.instruments.split(",") if s.strip()]
+
+    # fetch serially (one client, OANDA rate limits), backtest in parallel --
+    # each instrument's signal generation is independent
+    hists = {inst: fetch_history(inst, lookback=LOOKBACK) for inst in insts}
+    for inst, df in hists.items():
+        if df.empty:
+            raise SystemExit(f"No data fetched for {inst}.")
+
+    results = {}
+    if len(insts) == 1:
+        inst = insts[0]
+        results[inst] = compute_bt(hists[inst], inst)
+    else:
+        with ProcessPoolExecutor(max_workers=min(len(insts), os.cpu_count() or 1)) as ex:
+            futures = {ex.submit(compute_bt, hists[inst], inst): inst for inst in insts}
+            for fut in as_completed(futures):
+                results[futures[fut]] = fut.result()
 
-    df_tr = baseline_bt(args.instrument)
-    print(df_tr.tail(5))
-    m = metrics(df_tr)
-    print("\nRESULTS:")
-    for k, v in m.items():
-        print(f"{k}: {v}")
+    for inst in insts:
+        df_tr = results[inst]
+        print(f"\n=== {inst} ===")
+        print(df_tr.tail(5))
+        m = metrics(df_tr)
+        print("\nRESULTS:")
+        for k, v in m.items():
+            print(f"{k}: {v}")
 
-    out = f"backtest_BASELINE_{args.instrument}.csv"
-    df_tr.to_csv(out, index=False)
-    print(f"Saved trades -> {out}")
+        out = f"backtest_BASELINE_{inst}.csv"
+        df_tr.to_csv(out, index=False)
+        print(f"Saved trades -> {out}")
 
 if __name__ == "__main__":
     main()
@@ -1,9 +1,20 @@
 import os
-from dataclasses import dataclass
-from typing import List, Optional
+import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 
+try:
+    from numba import njit
+    _HAVE_NUMBA = True
+except ImportError:  # numba is optional; the NumPy scan below is the fallback
+    _HAVE_NUMBA = False
+
+try:
+    import polars as pl
+    _HAVE_POLARS = True
+except ImportError:  # polars is optional; pandas groupby is the fallback
+    _HAVE_POLARS = False
+
 load_dotenv()
 
 # ENV-configurable params (reasonable defaults)
@@ -19,144 +30,272 @@ INSTRUMENT = os.getenv("INSTRUMENT_BASELINE", os.getenv("INSTRUMENTS", "EUR_USD"
 BE_TRIGGER_PIPS = float(os.getenv("BE_TRIGGER_PIPS", "6.0"))   # move SL to BE after this many pips in profit
 LOCK_PROFIT_PIPS = float(os.getenv("LOCK_PROFIT_PIPS", "0.0")) # lock +X pips beyond BE
 
+# pip size by quote currency; anything not listed quotes in 0.0001 pips
+PIP_SIZE = {"JPY": 0.01}
+DEFAULT_PIP_SIZE = 0.0001
+
+def pip_size(instrument: str) -> float:
+    """Price value of one pip, from the instrument's quote currency."""
+    quote = instrument.rsplit("_", 1)[-1]
+    return PIP_SIZE.get(quote, DEFAULT_PIP_SIZE)
+
 def pips_to_price(pips: float, instrument: str) -> float:
-    if instrument.endswith("_JPY"):
-        return pips * 0.01
-    return pips * 0.0001
-
-@dataclass
-class Trade:
-    time: pd.Timestamp
-    side: str               # 'long' or 'short'
-    entry: float
-    sl: float
-    tp: float
-    exit: Optional[float] = None
-    exit_time: Optional[pd.Timestamp] = None
-    exit_reason: Optional[str] = None
+    return pips * pip_size(instrument)
+
+# one record per trade, stored column-wise -- no per-trade Python objects
+TRADE_DTYPE = np.dtype([
+    ("time", "datetime64[ns]"),       # entry time (UTC wall clock)
+    ("side", "U5"),                   # 'long' or 'short'
+    ("entry", "f8"),
+    ("sl", "f8"),
+    ("tp", "f8"),
+    ("exit", "f8"),
+    ("exit_time", "datetime64[ns]"),
+    ("reason", "U3"),                 # 'SL' / 'TP' / 'EOD'
+])
 
 def _hhmm_to_minutes(hhmm: str) -> int:
     return int(hhmm[:2]) * 60 + int(hhmm[2:])
 
-def _in_session(ts: pd.Timestamp) -> bool:
-    tsu = ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
-    minutes = tsu.hour * 60 + tsu.minute
-    return _hhmm_to_minutes(SESSION_START) <= minutes <= _hhmm_to_minutes(SESSION_END)
+def _to_utc(idx: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    return idx.tz_convert("UTC") if idx.tz is not None else idx.tz_localize("UTC")
+
+def _in_session_mask(idx: pd.DatetimeIndex) -> np.ndarray:
+    """Vectorized session filter: one boolean per timestamp, no per-element calls."""
+    idx_utc = _to_utc(idx)
+    minutes = idx_utc.hour * 60 + idx_utc.minute
+    return np.asarray((minutes >= _hhmm_to_minutes(SESSION_START)) &
+                      (minutes <= _hhmm_to_minutes(SESSION_END)))
 
-def _session_day_key(ts: pd.Timestamp) -> str:
-    tsu = ts.tz_convert("UTC") if ts.tzinfo else ts.tz_localize("UTC")
-    return tsu.strftime("%Y-%m-%d")
+def _day_keys(idx: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Per-row session-day key (UTC midnight), computed in one pass."""
+    return _to_utc(idx).normalize()
 
 def _first_window_mask(df: pd.DataFrame) -> pd.Series:
-    keys = df.index.map(_session_day_key)
-    first_mask = pd.Series(False, index=df.index)
-    for day in pd.unique(keys):
-        day_idx = (keys == day) & df.index.map(_in_session)
-        day_times = df.index[day_idx]
-        if len(day_times) == 0:
-            continue
-        start_time = day_times[0]
-        cutoff = start_time + pd.Timedelta(minutes=FIRST_WINDOW_MIN)
-        first_mask |= (df.index >= start_time) & (df.index < cutoff)
-    return first_mask
-
-def make_signals(df: pd.DataFrame, instrument: str = INSTRUMENT) -> List[Trade]:
-    """Video #1 baseline with buffer + SL/TP + breakeven (never loosens)."""
-    df = df.copy()
+    n = len(df)
+    mask = np.zeros(n, dtype=bool)
+    if n == 0:
+        return pd.Series(mask, index=df.index)
+    in_sess = _in_session_mask(df.index)
+    # the index is sorted, so day boundaries are where the day key changes --
+    # one O(N) pass instead of a `keys == day` scan per day
+    keys_i8 = _day_keys(df.index).asi8
+    change = np.flatnonzero(keys_i8[1:] != keys_i8[:-1]) + 1
+    day_starts = np.concatenate(([0], change))
+    day_ends = np.concatenate((change, [n]))
+    starts = []
+    for s, e in zip(day_starts, day_ends):
+        block = in_sess[s:e]
+        if block.any():
+            starts.append(df.index[s + int(np.argmax(block))])
+    # one bool array filled by slice assignment, instead of OR-ing an
+    # N-length mask per day
+    if starts:
+        starts = pd.DatetimeIndex(starts)
+        cutoffs = starts + pd.Timedelta(minutes=FIRST_WINDOW_MIN)
+        left = df.index.searchsorted(starts)
+        right = df.index.searchsorted(cutoffs)
+        for s, e in zip(left, right):
+            mask[s:e] = True
+    return pd.Series(mask, index=df.index)
+
+def _window_ranges(df: pd.DataFrame, day_i8: np.ndarray, first_mask: np.ndarray) -> dict:
+    """Per-day first-window (high, low), keyed by day, in one grouped pass.
+
+    Uses polars' multi-threaded group_by when available, otherwise a single
+    pandas groupby.agg -- either way no per-day slicing of the full frame.
+    """
+    if _HAVE_POLARS:
+        out = (pl.LazyFrame({"day": day_i8, "high": df["high"].to_numpy(),
+                             "low": df["low"].to_numpy(), "fw": first_mask})
+               .filter(pl.col("fw"))
+               .group_by("day")
+               .agg(pl.col("high").max(), pl.col("low").min())
+               .collect())
+        return dict(zip(out["day"].to_list(),
+                        zip(out["high"].to_list(), out["low"].to_list())))
+    fw = pd.DataFrame({"day": day_i8[first_mask],
+                       "high": df["high"].to_numpy()[first_mask],
+                       "low": df["low"].to_numpy()[first_mask]})
+    agg = fw.groupby("day").agg(high=("high", "max"), low=("low", "min"))
+    return {day: (high, low) for day, high, low in
+            zip(agg.index.to_numpy(), agg["high"].to_numpy(), agg["low"].to_numpy())}
+
+# exit-reason codes shared by the day walkers below
+_REASONS = ("SL", "TP", "EOD")
+_SL, _TP, _EOD = 0, 1, 2
+
+def _walk_day_loop(highs, lows, closes, long_trig, short_trig,
+                   sl_off, tp_off, be_off, lock_off):
+    """One day's breakout entry + SL/TP/BE state machine as a typed scalar loop.
+
+    Returns (entry_idx, exit_idx, is_long, entry, sl, exit_price, reason_code);
+    entry_idx is -1 when neither trigger fires. Written numba-first: plain
+    indexing and scalars only, so @njit compiles it to native code.
+    """
+    n = closes.shape[0]
+    entry_idx = -1
+    is_long = True
+    for i in range(n):
+        if closes[i] > long_trig:
+            entry_idx = i
+            is_long = True
+            break
+        if closes[i] < short_trig:
+            entry_idx = i
+            is_long = False
+            break
+    if entry_idx == -1:
+        return -1, -1, True, 0.0, 0.0, 0.0, _EOD
+
+    entry = closes[entry_idx]
+    moved_be = False
+    if is_long:
+        sl = entry - sl_off
+        tp = entry + tp_off
+        water = highs[entry_idx]
+        for j in range(entry_idx + 1, n):
+            if highs[j] > water:
+                water = highs[j]
+            if not moved_be and water >= entry + be_off:
+                new_sl = entry + lock_off
+                if new_sl > sl:
+                    sl = new_sl
+                moved_be = True
+            if lows[j] <= sl:
+                return entry_idx, j, True, entry, sl, sl, _SL
+            if highs[j] >= tp:
+                return entry_idx, j, True, entry, sl, tp, _TP
+        return entry_idx, n - 1, True, entry, sl, closes[n - 1], _EOD
+    else:
+        sl = entry + sl_off
+        tp = entry - tp_off
+        water = lows[entry_idx]
+        for j in range(entry_idx + 1, n):
+            if lows[j] < water:
+                water = lows[j]
+            if not moved_be and water <= entry - be_off:
+                new_sl = entry - lock_off
+                if new_sl < sl:
+                    sl = new_sl
+                moved_be = True
+            if highs[j] >= sl:
+                return entry_idx, j, False, entry, sl, sl, _SL
+            if lows[j] <= tp:
+                return entry_idx, j, False, entry, sl, tp, _TP
+        return entry_idx, n - 1, False, entry, sl, closes[n - 1], _EOD
+
+def _walk_day_numpy(highs, lows, closes, long_trig, short_trig,
+                    sl_off, tp_off, be_off, lock_off):
+    """Pure-NumPy fallback for _walk_day; same contract as _walk_day_loop."""
+    crossed = (closes > long_trig) | (closes < short_trig)
+    if not crossed.any():
+        return -1, -1, True, 0.0, 0.0, 0.0, _EOD
+    i = int(np.argmax(crossed))
+    entry = closes[i]
+    is_long = bool(entry > long_trig)
+
+    # SL/TP are fixed at entry, and breakeven only tightens once, so the walk
+    # reduces to array comparisons on the bars after entry.
+    h = highs[i + 1:]
+    l = lows[i + 1:]
+    if is_long:
+        sl0 = entry - sl_off
+        tp = entry + tp_off
+        # running high including the entry bar, aligned with bars i+1..n-1
+        water = np.maximum.accumulate(highs[i:])[1:]
+        be_hit = water >= entry + be_off
+        be_sl = max(sl0, entry + lock_off)
+        sl_arr = np.full(len(h), sl0)
+        if be_hit.any():
+            sl_arr[int(np.argmax(be_hit)):] = be_sl
+        sl_mask = l <= sl_arr
+        tp_mask = h >= tp
+    else:
+        sl0 = entry + sl_off
+        tp = entry - tp_off
+        water = np.minimum.accumulate(lows[i:])[1:]
+        be_hit = water <= entry - be_off
+        be_sl = min(sl0, entry - lock_off)
+        sl_arr = np.full(len(h), sl0)
+        if be_hit.any():
+            sl_arr[int(np.argmax(be_hit)):] = be_sl
+        sl_mask = h >= sl_arr
+        tp_mask = l <= tp
+
+    exited = sl_mask | tp_mask
+    if exited.any():
+        j = int(np.argmax(exited))
+        # SL checked before TP when both hit within the same bar
+        if sl_mask[j]:
+            return i, i + 1 + j, is_long, entry, sl_arr[j], sl_arr[j], _SL
+        return i, i + 1 + j, is_long, entry, sl_arr[j], tp, _TP
+    sl = sl_arr[-1] if len(sl_arr) else sl0
+    return i, len(closes) - 1, is_long, entry, sl, closes[-1], _EOD
+
+if _HAVE_NUMBA:
+    _walk_day = njit(cache=True)(_walk_day_loop)
+else:
+    _walk_day = _walk_day_numpy
+
+def make_signals(df: pd.DataFrame, instrument: str = INSTRUMENT) -> np.ndarray:
+    """Video #1 baseline with buffer + SL/TP + breakeven (never loosens).
+
+    Returns a structured array of TRADE_DTYPE records, at most one per day.
+    """
     if df.index.tz is None:
-        df.index = df.index.tz_localize("UTC")
+        # re-label the index without duplicating the OHLC columns
+        df = df.set_axis(df.index.tz_localize("UTC"))
 
-    in_sess = df.index.map(_in_session)
+    in_sess = _in_session_mask(df.index)
     df = df[in_sess]
     if df.empty:
-        return []
+        return np.empty(0, TRADE_DTYPE)
 
     first_mask = _first_window_mask(df)
 
-    trades: List[Trade] = []
-    day_keys = df.index.map(_session_day_key)
+    day_keys = _day_keys(df.index)
 
-    for day in pd.unique(day_keys):
-        day_df = df[day_keys == day]
-        if day_df.empty:
-            continue
-        fw = day_df[first_mask.loc[day_df.index]]
-        if fw.empty:
+    # pip size depends only on the instrument -- look it up once per call
+    pip = pip_size(instrument)
+    buf = BUFFER_PIPS * pip
+    sl_off = SL_PIPS * pip
+    tp_off = TP_PIPS * pip
+    be_off = BE_TRIGGER_PIPS * pip
+    lock_off = LOCK_PROFIT_PIPS * pip
+
+    # per-day breakout ranges in one grouped pass, then one groupby pass
+    # over the days instead of an O(N) `day_keys == day` scan per day
+    day_i8 = day_keys.asi8
+    ranges = _window_ranges(df, day_i8, first_mask.to_numpy())
+    # at most one trade per day -> preallocate and trim
+    trades = np.empty(len(ranges), TRADE_DTYPE)
+    k = 0
+    for day, day_df in df.groupby(day_i8, sort=False):
+        rng = ranges.get(day)
+        if rng is None:  # day has no first-window bars
             continue
-        rng_high = fw["high"].max()
-        rng_low = fw["low"].min()
-        buf = pips_to_price(BUFFER_PIPS, instrument)
+        rng_high, rng_low = rng
         long_trig = rng_high + buf
         short_trig = rng_low - buf
 
-        entered = False
-        moved_be = False
-        high_water = None
-        low_water = None
-
-        for t, row in day_df.iterrows():
-            if not entered:
-                if row["close"] > long_trig:
-                    entry = row["close"]
-                    sl = entry - pips_to_price(SL_PIPS, instrument)
-                    tp = entry + pips_to_price(TP_PIPS, instrument)
-                    trade = Trade(time=t, side="long", entry=entry, sl=sl, tp=tp)
-                    entered = True
-                    high_water = row["high"]
-                elif row["close"] < short_trig:
-                    entry = row["close"]
-                    sl = entry + pips_to_price(SL_PIPS, instrument)
-                    tp = entry - pips_to_price(TP_PIPS, instrument)
-                    trade = Trade(time=t, side="short", entry=entry, sl=sl, tp=tp)
-                    entered = True
-                    low_water = row["low"]
-                else:
-                    continue
-            else:
-                if trade.side == "long":
-                    high_water = max(high_water, row["high"]) if high_water is not None else row["high"]
-                    be_trigger_price = trade.entry + pips_to_price(BE_TRIGGER_PIPS, instrument)
-                    if not moved_be and high_water >= be_trigger_price:
-                        new_sl = trade.entry + pips_to_price(LOCK_PROFIT_PIPS, instrument)
-                        trade.sl = max(trade.sl, new_sl)
-                        moved_be = True
-                    if row["low"] <= trade.sl:
-                        trade.exit = trade.sl
-                        trade.exit_time = t
-                        trade.exit_reason = "SL"
-                        trades.append(trade)
-                        break
-                    if row["high"] >= trade.tp:
-                        trade.exit = trade.tp
-                        trade.exit_time = t
-                        trade.exit_reason = "TP"
-                        trades.append(trade)
-                        break
-                else:  # short
-                    low_water = min(low_water, row["low"]) if low_water is not None else row["low"]
-                    be_trigger_price = trade.entry - pips_to_price(BE_TRIGGER_PIPS, instrument)
-                    if not moved_be and low_water <= be_trigger_price:
-                        new_sl = trade.entry - pips_to_price(LOCK_PROFIT_PIPS, instrument)
-                        trade.sl = min(trade.sl, new_sl)
-                        moved_be = True
-                    if row["high"] >= trade.sl:
-                        trade.exit = trade.sl
-                        trade.exit_time = t
-                        trade.exit_reason = "SL"
-                        trades.append(trade)
-                        break
-                    if row["low"] <= trade.tp:
-                        trade.exit = trade.tp
-                        trade.exit_time = t
-                        trade.exit_reason = "TP"
-                        trades.append(trade)
-                        break
-
-        if entered and trade.exit is None:
-            last_t = day_df.index[-1]
-            trade.exit = day_df["close"].iloc[-1]
-            trade.exit_time = last_t
-            trade.exit_reason = "EOD"
-            trades.append(trade)
-
-    return trades
+        highs = day_df["high"].to_numpy()
+        lows = day_df["low"].to_numpy()
+        closes = day_df["close"].to_numpy()
+        times = day_df.index
+
+        entry_idx, exit_idx, is_long, entry, sl, exit_price, reason = _walk_day(
+            highs, lows, closes, long_trig, short_trig,
+            sl_off, tp_off, be_off, lock_off)
+        if entry_idx == -1:
+            continue
+
+        side = "long" if is_long else "short"
+        tp = entry + tp_off if is_long else entry - tp_off
+        # to_datetime64() is the UTC instant, unit-aware -> exact ns cast
+        trades[k] = (times[entry_idx].to_datetime64(), side, entry, sl, tp,
+                     exit_price, times[exit_idx].to_datetime64(),
+                     _REASONS[reason])
+        k += 1
+
+    return trades[:k]
@@ -12,46 +12,116 @@ ENV         = os.getenv("OANDA_ENV", "practice")  # practice or live (use practi
 INSTRUMENTS = [s.strip() for s in os.getenv("INSTRUMENTS", "EUR_USD").split(",")]
 GRANULARITY = os.getenv("GRANULARITY", "M5")
 LOOKBACK    = int(os.getenv("LOOKBACK_CANDLES", "300"))
+CACHE_DIR   = os.getenv("CANDLE_CACHE_DIR", "cache")
 
 api = None
 if API_KEY:
     api = oandapyV20.API(access_token=API_KEY, environment=ENV)
 
-def fetch_candles(instrument: str, count: int = 100, granularity: str = GRANULARITY) -> pd.DataFrame:
-    """Fetch up to 500 recent, completed candles for an instrument."""
+def _cache_path(instrument: str, granularity: str) -> str:
+    return os.path.join(CACHE_DIR, f"{instrument}_{granularity}.parquet")
+
+def _load_cache(instrument: str, granularity: str) -> pd.DataFrame:
+    path = _cache_path(instrument, granularity)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_parquet(path)
+
+def _save_cache(df: pd.DataFrame, instrument: str, granularity: str) -> None:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    df.to_parquet(_cache_path(instrument, granularity), compression="zstd")
+
+def _rfc3339(ts: pd.Timestamp) -> str:
+    return ts.tz_convert("UTC").strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def fetch_candles(instrument: str, count: int = 100, granularity: str = GRANULARITY,
+                  from_time: pd.Timestamp = None, to_time: pd.Timestamp = None) -> pd.DataFrame:
+    """Fetch up to 500 completed candles; from_time/to_time page through history."""
     if api is None:
         raise RuntimeError("OANDA_API_KEY missing. Set it in .env")
     params = {"granularity": granularity, "count": min(count, 500), "price": "M"}
+    if from_time is not None:
+        params["from"] = _rfc3339(from_time)
+    if to_time is not None:
+        params["to"] = _rfc3339(to_time)
     r = InstrumentsCandles(instrument=instrument, params=params)
     api.request(r)
-    rows = []
-    for c in r.response["candles"]:
-        if not c["complete"]:
-            continue
-        mid = c["mid"]
-        rows.append([c["time"], float(mid["o"]), float(mid["h"]), float(mid["l"]), float(mid["c"])])
-    df = pd.DataFrame(rows, columns=["time", "open", "high", "low", "close"]).dropna()
+    # flatten the whole response in one shot instead of a per-candle loop
+    df = pd.json_normalize(r.response["candles"])
+    if df.empty or not df["complete"].any():
+        return pd.DataFrame(columns=["open", "high", "low", "close"],
+                            index=pd.DatetimeIndex([], tz="UTC", name="time"))
+    df = df[df["complete"]]
+    df = df[["time", "mid.o", "mid.h", "mid.l", "mid.c"]]
+    df.columns = ["time", "open", "high", "low", "close"]
+    # float32 halves the memory bandwidth of the vectorized scans; FX mid
+    # prices carry ~6 significant digits, well inside float32 precision
+    df = df.astype({"open": "float32", "high": "float32",
+                    "low": "float32", "close": "float32"}).dropna()
     df["time"] = pd.to_datetime(df["time"])
     df.set_index("time", inplace=True)
     return df
 
-def fetch_history(instrument: str, lookback: int = LOOKBACK, granularity: str = GRANULARITY) -> pd.DataFrame:
-    """Fetch up to `lookback` candles, in 500-sized batches."""
+def _fetch_recent(instrument: str, lookback: int, granularity: str) -> pd.DataFrame:
+    """Fetch the most recent `lookback` candles, paging backwards with `to`."""
     out = []
     remaining = lookback
+    to = None
     while remaining > 0:
-        cnt = min(remaining, 500)
-        df = fetch_candles(instrument, count=cnt, granularity=granularity)
+        # `to` is inclusive, so ask for one extra candle and drop the boundary
+        cnt = min(remaining if to is None else remaining + 1, 500)
+        df = fetch_candles(instrument, count=cnt, granularity=granularity, to_time=to)
+        if to is not None:
+            df = df[df.index < to]
+        # an empty page means history is exhausted; a short page is not a
+        # reliable signal (fetch_candles drops incomplete candles), so keep
+        # paging backwards until empty or `remaining` is satisfied
         if df.empty:
             break
         out.append(df)
         remaining -= len(df)
+        to = df.index[0]
         time.sleep(0.1)  # be gentle
-        if len(df) < cnt:
+    if not out:
+        return pd.DataFrame()
+    return pd.concat(out).sort_index()
+
+def _fetch_since(instrument: str, start: pd.Timestamp, granularity: str) -> pd.DataFrame:
+    """Fetch only the candles newer than `start`, walking forward in batches."""
+    out = []
+    frm = start
+    while True:
+        df = fetch_candles(instrument, count=500, granularity=granularity, from_time=frm)
+        df = df[df.index > frm]
+        if df.empty:
             break
+        out.append(df)
+        frm = df.index[-1]
+        time.sleep(0.1)  # be gentle
     if not out:
         return pd.DataFrame()
-    hist = pd.concat(out).sort_index()
+    return pd.concat(out).sort_index()
+
+def fetch_history(instrument: str, lookback: int = LOOKBACK, granularity: str = GRANULARITY) -> pd.DataFrame:
+    """Return up to `lookback` candles, topping up the local Parquet cache.
+
+    Re-runs only download the candles newer than the cached tail, so the
+    network cost of a backtest drops to (at most) one small request.
+    """
+    hist = _load_cache(instrument, granularity)
+    if not hist.empty:
+        new = _fetch_since(instrument, hist.index[-1], granularity)
+        if not new.empty:
+            hist = pd.concat([hist, new])
+    if len(hist) < lookback:
+        # cold cache, or cache shorter than the requested lookback
+        recent = _fetch_recent(instrument, lookback, granularity)
+        if not recent.empty:
+            hist = pd.concat([hist, recent]) if not hist.empty else recent
+    if hist.empty:
+        return pd.DataFrame()
+    hist = hist[~hist.index.duplicated(keep="last")].sort_index()
+    _save_cache(hist, instrument, granularity)
     return hist.tail(lookback)
 
 if __name__ == "__main__":